@@ -10,6 +10,7 @@ Usage:
     python build.py /path/to/vault --title "My Site"
     python build.py /path/to/vault -o /path/to/output
     python build.py /path/to/vault --spa ../file-explore
+    python build.py /path/to/vault --force
 """
 
 import argparse
@@ -18,8 +19,10 @@ import shutil
 import sys
 from pathlib import Path
 
+import mistune
+
 from frontmatter import enrich_manifest
-from manifest import generate_manifest
+from manifest import generate_manifest, pop_sources, write_manifest
 from parser import parse_vault
 
 # ---------------------------------------------------------------------------
@@ -34,18 +37,46 @@ DEFAULT_TITLE = "Digi Garden"
 # and the manifest goes into <spa_root>/manifest.json
 CONTENT_STORE_DIR = "content-store"
 
+# Stamped into manifest.json as "buildVersion". Bump it whenever the HTML
+# written for an unchanged vault changes (renderer, resolver, pipeline),
+# so the first build after an upgrade re-renders every page instead of
+# keeping fragments from the older tool; a mistune upgrade does the same.
+BUILD_VERSION = f"3+mistune-{mistune.__version__}"
+
 
 # ---------------------------------------------------------------------------
 # Pipeline
 # ---------------------------------------------------------------------------
 
-def build(vault_path: str, output_dir: str, title: str, spa_root: str | None = None) -> None:
+def _load_previous_manifest(path: Path) -> dict | None:
+    """Load the manifest written by the previous build, if any."""
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def build(
+    vault_path: str,
+    output_dir: str,
+    title: str,
+    spa_root: str | None = None,
+    force: bool = False,
+) -> None:
     """Run the full build pipeline.
 
     If *spa_root* is provided the output is placed directly into the
     file-explore SPA:
         <spa_root>/content-store/  ← HTML fragments + graphics
         <spa_root>/manifest.json   ← manifest
+
+    When the new manifest is identical to the one already on disk the
+    output is kept and only notes modified since their HTML was written
+    are re-rendered.  Any manifest change (new, moved or retitled notes)
+    affects link resolution across pages, so it triggers a full rebuild,
+    as do a new BUILD_VERSION and *force*.  The manifest is written only
+    once every page has been rendered, so a build that stops partway
+    leaves none behind and the next one starts from scratch.
     """
     vault = Path(vault_path).resolve()
 
@@ -62,28 +93,40 @@ def build(vault_path: str, output_dir: str, title: str, spa_root: str | None = N
         output = Path(output_dir).resolve()
         manifest_dest = output / DEFAULT_MANIFEST_NAME
 
-    # Clean content-store so stale files don't linger
-    if output.is_dir():
-        shutil.rmtree(output)
-    output.mkdir(parents=True, exist_ok=True)
+    previous = _load_previous_manifest(manifest_dest)
 
     # --- Step 1: Generate manifest ---
     print(f"[1/3] Generating manifest from: {vault}")
     manifest = generate_manifest(str(vault), title=title)
+    sources = pop_sources(manifest)
     print(f"  Manifest generated ({len(manifest['items'])} nodes)")
 
     # --- Step 2: Enrich manifest with front matter metadata ---
     print(f"[2/3] Extracting front matter metadata")
-    enrich_manifest(manifest, vault)
+    enrich_manifest(manifest, sources)
+    manifest["buildVersion"] = BUILD_VERSION
 
-    # Write manifest (after enrichment so metadata is included)
-    manifest_dest.parent.mkdir(parents=True, exist_ok=True)
-    manifest_dest.write_text(json.dumps(manifest, indent=2) + "\n")
-    print(f"  Manifest written to {manifest_dest}")
+    incremental = not force and output.is_dir() and previous == manifest
+    if incremental:
+        print("  Manifest unchanged — re-rendering modified notes only")
+    else:
+        # Clean content-store so stale files don't linger
+        if output.is_dir():
+            shutil.rmtree(output)
+        output.mkdir(parents=True, exist_ok=True)
+
+    # The manifest marks a complete build: drop the old one until this
+    # build has finished, so an interrupted run can't pass for fresh
+    manifest_dest.unlink(missing_ok=True)
 
     # --- Step 3: Parse vault ---
     print(f"[3/3] Parsing vault → HTML")
-    parse_vault(manifest, vault, output)
+    parse_vault(manifest, sources, output, incremental=incremental)
+
+    # Write manifest (after enrichment so metadata is included)
+    manifest_dest.parent.mkdir(parents=True, exist_ok=True)
+    write_manifest(manifest, manifest_dest)
+    print(f"  Manifest written to {manifest_dest}")
 
     if spa_root:
         print(f"SPA ready at: {spa}")
@@ -119,9 +162,14 @@ def main():
         default=DEFAULT_TITLE,
         help=f"Title for the root landing page (default: '{DEFAULT_TITLE}').",
     )
+    ap.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild everything, even notes unchanged since the last build.",
+    )
 
     args = ap.parse_args()
-    build(args.vault_path, args.output, args.title, spa_root=args.spa)
+    build(args.vault_path, args.output, args.title, spa_root=args.spa, force=args.force)
 
 
 if __name__ == "__main__":
@@ -15,13 +15,21 @@ Supported value types:
 A ``title`` key in front matter overrides the filename-derived title.
 """
 
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 from pathlib import Path
 
 import yaml
 
-from manifest import slugify
+
+# libyaml's C loader is an order of magnitude faster; fall back to the
+# pure-Python loader when PyYAML was built without it.
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 
 
 # ---------------------------------------------------------------------------
@@ -30,6 +38,9 @@ from manifest import slugify
 
 _FRONTMATTER_RE = re.compile(r"\A---\s*\n(.*?\n)---\s*\n?", re.DOTALL)
 
+# Front matter sits at the top of a note; never scan further than this
+_FRONTMATTER_MAX = 65536
+
 
 def extract_frontmatter(text: str) -> tuple[dict, str]:
     """Split leading YAML front matter from markdown body.
@@ -38,15 +49,14 @@ def extract_frontmatter(text: str) -> tuple[dict, str]:
         (metadata_dict, body_without_frontmatter)
         If no front matter is found, returns ({}, original_text).
     """
-    m = _FRONTMATTER_RE.match(text)
-    if m is None:
+    split = _split_frontmatter(text)
+    if split is None:
         return {}, text
 
-    raw_yaml = m.group(1)
-    body = text[m.end():]
+    raw_yaml, body = split
 
     try:
-        parsed = yaml.safe_load(raw_yaml)
+        parsed = yaml.load(raw_yaml, Loader=_YamlLoader)
     except yaml.YAMLError:
         # Malformed YAML → treat as no front matter
         return {}, text
@@ -58,12 +68,45 @@ def extract_frontmatter(text: str) -> tuple[dict, str]:
     return metadata, body
 
 
+def strip_frontmatter(text: str) -> str:
+    """Return the markdown body with any leading front matter block removed.
+
+    For callers that discard the metadata: the block is cut out without
+    running the YAML parser.  Unlike extract_frontmatter(), a block that
+    is not a valid YAML mapping is still removed, as Obsidian hides it.
+    """
+    split = _split_frontmatter(text)
+    return text if split is None else split[1]
+
+
+def _split_frontmatter(text: str) -> tuple[str, str] | None:
+    """Return ``(raw_yaml, body)``, or None if *text* has no front matter block."""
+    if not text.startswith("---"):
+        return None
+
+    # Fast path: locate the delimiters with plain string scans
+    eol = text.find("\n", 3, _FRONTMATTER_MAX)
+    if eol != -1 and not text[3:eol].strip():
+        close = text.find("\n---", eol + 1, _FRONTMATTER_MAX)
+        if close != -1:
+            return text[eol + 1:close + 1], text[close + 4:].lstrip()
+
+    m = _FRONTMATTER_RE.match(text, 0, _FRONTMATTER_MAX)
+    if m is None:
+        return None
+    return m.group(1), text[m.end():]
+
+
+# Types _normalise() rewrites (datetime is a subclass of date)
+_NEEDS_NORMALISE = (date, list, dict)
+
+
 def _normalise_values(data: dict) -> dict:
     """Convert date/datetime objects to ISO strings for JSON serialisation."""
-    out: dict = {}
-    for key, value in data.items():
-        out[key] = _normalise(value)
-    return out
+    # Common case: every value is already JSON-native — reuse the dict as-is
+    if not any(isinstance(v, _NEEDS_NORMALISE) for v in data.values()):
+        return data
+    return {key: _normalise(value) for key, value in data.items()}
 
 
 def _normalise(value):
@@ -84,7 +127,7 @@ def _normalise(value):
 # Manifest enrichment
 # ---------------------------------------------------------------------------
 
-def enrich_manifest(manifest: dict, vault_path: Path) -> dict:
+def enrich_manifest(manifest: dict, sources: dict[str, str]) -> dict:
     """Populate ``metadata`` on every file/directory node in-place.
 
     For each eligible node the corresponding .md source is read,
@@ -93,35 +136,40 @@ def enrich_manifest(manifest: dict, vault_path: Path) -> dict:
     key its value overrides the node title.
 
     Args:
-        manifest:   The manifest dict produced by ``generate_manifest()``.
-        vault_path: Resolved path to the source vault directory.
+        manifest: The manifest dict produced by ``generate_manifest()``.
+        sources:  ``{node id: source path}`` as returned by
+                  ``manifest.pop_sources()``; nodes without an entry
+                  are skipped.
 
     Returns:
         The same manifest dict (mutated in-place) for convenience.
     """
     items = manifest["items"]
 
-    for node in items.values():
-        ntype = node["type"]
-        if ntype not in ("file", "directory"):
+    nodes: list[dict] = []
+    paths: list[Path] = []
+    for node_id, node in items.items():
+        if node["type"] not in ("file", "directory"):
             continue
-
-        src_file = _resolve_source(node, vault_path, slugify)
-        if src_file is None or not src_file.is_file():
-            continue
-
-        content = src_file.read_text(encoding="utf-8")
-        metadata, _ = extract_frontmatter(content)
-
-        if not metadata:
+        src = sources.get(node_id)
+        if src is None:
             continue
+        nodes.append(node)
+        paths.append(Path(src))
+
+    # Reads are I/O-bound, so a thread pool overlaps the disk latency
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for node, metadata in zip(nodes, pool.map(_read_frontmatter, paths)):
+            if not metadata:
+                continue
 
-        # title override
-        if "title" in metadata:
-            node["title"] = str(metadata.pop("title"))
+            # title override
+            if "title" in metadata:
+                node["title"] = str(metadata.pop("title"))
 
-        if metadata:
-            node["metadata"] = metadata
+            if metadata:
+                node["metadata"] = metadata
 
     count = sum(1 for n in items.values() if "metadata" in n)
     print(f"  [frontmatter] Enriched {count} node(s) with metadata.")
@@ -129,88 +177,22 @@ def enrich_manifest(manifest: dict, vault_path: Path) -> dict:
     return manifest
 
 
-# ---------------------------------------------------------------------------
-# Source resolution helpers
-# ---------------------------------------------------------------------------
+def _read_frontmatter(src_file: Path) -> dict:
+    """Read a .md source and return its front matter ({} if none).
 
-def _resolve_source(node: dict, vault_path: Path, slugify) -> Path | None:
-    """Find the .md source for a manifest node."""
-    slug = node["slug"]
-    ntype = node["type"]
-
-    if ntype == "directory":
-        return _find_readme_for_slug(slug, vault_path, slugify)
-    else:
-        return _find_file_for_slug(slug, vault_path, slugify)
-
-
-def _find_file_for_slug(slug: str, vault_path: Path, slugify) -> Path | None:
-    """Locate the .md source file for a file-type slug."""
-    # Fast path: literal path
-    candidate = vault_path / (slug + ".md")
-    if candidate.is_file():
-        return candidate
-
-    # Slug segments may be kebab-cased — walk the real dirs
-    parts = slug.split("/")
-    if parts[0] == "root":
-        parts = parts[1:]
-
-    filename_slug = parts[-1]
-    parent_parts = parts[:-1]
-
-    parent = vault_path
-    for p in parent_parts:
-        parent = _match_dir(parent, p, slugify)
-        if parent is None:
-            return None
-
-    # Scan files in parent directory
-    if not parent.is_dir():
-        return None
-
-    for entry in parent.iterdir():
-        if entry.is_file() and entry.suffix.lower() == ".md":
-            if entry.name.lower() == "readme.md":
-                continue
-            if slugify(entry.stem) == filename_slug:
-                return entry
-
-    return None
-
-
-def _find_readme_for_slug(slug: str, vault_path: Path, slugify) -> Path | None:
-    """Locate the README.md for a directory-type slug."""
-    if slug == "root":
-        target = vault_path
-    else:
-        parts = slug.split("/")
-        target = vault_path
-        for p in parts:
-            target = _match_dir(target, p, slugify)
-            if target is None:
-                return None
-
-    if target is None or not target.is_dir():
-        return None
-
-    for entry in target.iterdir():
-        if entry.is_file() and entry.name.lower() == "readme.md":
-            return entry
-    return None
-
-
-def _match_dir(parent: Path, slug_segment: str, slugify) -> Path | None:
-    """Match a slug segment to an actual subdirectory."""
-    # Fast path
-    candidate = parent / slug_segment
-    if candidate.is_dir():
-        return candidate
-
-    if not parent.is_dir():
-        return None
+    Only the head of the note is read, since extract_frontmatter() never
+    looks past ``_FRONTMATTER_MAX`` characters anyway.
+    """
+    try:
+        with open(src_file, "rb") as f:
+            head = f.read(_FRONTMATTER_MAX)
+            text = head.decode("utf-8", errors="replace")
+            metadata, _ = extract_frontmatter(text)
+            if not metadata and len(head) == _FRONTMATTER_MAX and text.startswith("---"):
+                # Multi-byte characters can push the closing --- past the
+                # byte prefix while still inside the character limit
+                metadata, _ = extract_frontmatter((head + f.read()).decode("utf-8"))
+    except (FileNotFoundError, IsADirectoryError):
+        return {}
+    return metadata
 
-    for entry in parent.iterdir():
-        if entry.is_dir() and slugify(entry.name) == slug_segment:
-            return entry
-    return None
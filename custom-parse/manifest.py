@@ -18,12 +18,18 @@ Usage:
 """
 
 import argparse
+import functools
 import json
+import math
 import os
-import re
 import sys
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # optional: faster manifest serialisation
+    orjson = None
+
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -32,20 +38,47 @@ from pathlib import Path
 IGNORE_DIRS = {".obsidian", ".excalidraw"}
 IGNORE_FILES = {".DS_Store"}
 GRAPHICS_DIR_NAME = "graphics"
-IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".bmp"}
+IMAGE_EXTENSIONS = frozenset({"png", "jpg", "jpeg", "gif", "svg", "webp", "bmp"})  # no dot
+
+# Node key holding the absolute path of the node's source: the .md note,
+# a directory's README.md, or a graphics directory. Build-time only —
+# split off by pop_sources() and never written to manifest.json.
+SOURCE_KEY = "_src"
+
+
+class _SlugTable(dict):
+    """``str.translate`` table for slugify(), applied after lowercasing.
+
+    Keeps ``[a-z0-9/-]``, turns ``_`` and whitespace into ``-`` and drops
+    everything else.  Code points not prefilled are classified on first
+    sight and cached.
+    """
+
+    def __missing__(self, codepoint: int) -> str | None:
+        value = "-" if chr(codepoint).isspace() else None
+        self[codepoint] = value
+        return value
+
+
+_SLUG_TABLE = _SlugTable({ord(c): c for c in "abcdefghijklmnopqrstuvwxyz0123456789-/"})
+_SLUG_TABLE[ord("_")] = "-"
 
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=8192)
 def slugify(text: str) -> str:
-    """Convert a string to a URL-friendly kebab-case slug."""
-    text = text.strip().lower()
-    text = re.sub(r"[^a-z0-9\s\-_/]", "", text)
-    text = re.sub(r"[\s_]+", "-", text)
-    text = re.sub(r"-+", "-", text)
-    return text.strip("-")
+    """Convert a string to a URL-friendly kebab-case slug.
+
+    Memoised: the same directory and file names are slugified over and
+    over while walking the vault and resolving sources.
+    """
+    # One translate pass, then split/join collapses dash runs and trims
+    # leading/trailing dashes in the same step.
+    parts = text.lower().translate(_SLUG_TABLE).split("-")
+    return "-".join(p for p in parts if p)
 
 
 def make_id(slug: str, node_type: str) -> str:
@@ -84,65 +117,75 @@ def make_title(name: str) -> str:
     return name.title()
 
 
-def has_readme(directory: Path) -> str | None:
-    """Check if a directory contains a README.md (case-insensitive).
-    
-    Returns the actual filename if found, None otherwise.
-    """
-    for entry in directory.iterdir():
-        if entry.is_file() and entry.name.lower() == "readme.md":
-            return entry.name
-    return None
-
+def is_graphics_dir(name: str, is_dir: bool) -> bool:
+    """Check if a directory entry is a graphics directory."""
+    return is_dir and name.lower() == GRAPHICS_DIR_NAME
 
-def is_graphics_dir(path: Path) -> bool:
-    """Check if a directory is a graphics directory."""
-    return path.name.lower() == GRAPHICS_DIR_NAME
 
+def should_ignore(name: str, is_dir: bool) -> bool:
+    """Check if a file or directory should be ignored.
 
-def should_ignore(path: Path) -> bool:
-    """Check if a file or directory should be ignored."""
-    if path.name in IGNORE_FILES:
+    Takes the entry's name and type (as cached at scan time) rather than
+    a path, so checking an entry costs no stat call.
+    """
+    if name in IGNORE_FILES:
         return True
-    if path.is_dir() and path.name in IGNORE_DIRS:
+    if is_dir and name in IGNORE_DIRS:
         return True
     return False
 
 
-def collect_assets(graphics_path: Path) -> list[str]:
+def collect_assets(graphics_path: Path | str) -> list[str]:
     """Collect media asset filenames from a graphics directory."""
     assets = []
-    for entry in sorted(graphics_path.iterdir()):
-        if entry.is_file() and entry.suffix.lower() in IMAGE_EXTENSIONS:
-            assets.append(entry.name)
+    with os.scandir(graphics_path) as it:
+        for entry in it:
+            name = entry.name
+            dot = name.rfind(".")
+            # dot > 0: a bare ".png" is a hidden file, not a PNG
+            if dot > 0 and name[dot + 1:].lower() in IMAGE_EXTENSIONS and entry.is_file():
+                assets.append(name)
+    # Filter first, then sort the (smaller) matching set once
+    assets.sort()
     return assets
 
 
 # ---------------------------------------------------------------------------
-# Core: recursive directory walker
+# Core: directory walker
 # ---------------------------------------------------------------------------
 
-def walk_directory(dir_path: Path, vault_root: Path, root_title: str | None = None) -> dict | None:
-    """Recursively walk a directory and build manifest nodes.
-    
-    Returns a dict with:
-        - "node": the manifest node for this directory
-        - "extra_nodes": flat list of all descendant nodes (including this one)
-    Or None if the directory is not eligible (no README).
+def _open_directory(
+    dir_path: str, vault_root: str, root_title: str | None = None
+) -> tuple[dict, str, list[tuple]] | None:
+    """Scan a directory and build its (childless) manifest node.
+
+    Returns ``(dir_node, slug_prefix, sorted_entries)``, or None if the
+    directory is not eligible (no README).  Entries are
+    ``(not_dir, name_lower, name, DirEntry)`` tuples, sorted so that
+    directories come first, then by case-insensitive name.
     """
+    # One scan serves the README check, the sort keys and the child listing.
+    # DirEntry caches the file type, so is_dir()/is_file() cost no stat.
+    with os.scandir(dir_path) as it:
+        entries = [(not e.is_dir(), e.name.lower(), e.name, e) for e in it]
+
     # Check README signal
-    readme_name = has_readme(dir_path)
-    if readme_name is None:
+    readme = next(
+        (e for _, lower, _, e in entries if lower == "readme.md" and e.is_file()), None
+    )
+    if readme is None:
         return None
 
+    # Plain string paths: this runs for every directory in the vault, and
+    # Path arithmetic allocates a new object per operation
     is_root = (dir_path == vault_root)
-    rel_path = dir_path.relative_to(vault_root)
-    dir_slug = "root" if is_root else slugify(str(rel_path))
+    rel_path = dir_path[len(vault_root):].lstrip(os.sep)
+    dir_slug = "root" if is_root else slugify(rel_path)
 
     # Build the directory node
     dir_id = "root-dir" if is_root else make_id(dir_slug, "directory")
     title = root_title if (is_root and root_title) else (
-        "Root" if is_root else make_title(dir_path.name)
+        "Root" if is_root else make_title(os.path.basename(dir_path))
     )
 
     # content_path for the directory is its README.html
@@ -158,76 +201,107 @@ def walk_directory(dir_path: Path, vault_root: Path, root_title: str | None = No
         "slug": dir_slug,
         "content_path": content_path,
         "children": [],
+        SOURCE_KEY: readme.path,
     }
 
-    all_nodes = {}  # id → node
-    children_ids = []
+    # Plain tuple sort — keys were computed once during the scan; names
+    # are unique within a directory so the DirEntry is never compared
+    entries.sort()
+
+    return dir_node, "" if is_root else f"{dir_slug}/", entries
+
+
+def walk_directory(
+    dir_path: Path | str, vault_root: Path | str, items: dict, root_title: str | None = None
+) -> dict | None:
+    """Walk a directory tree and add its manifest nodes to *items*.
+
+    Depth-first over an explicit stack, so deep vaults cost no recursion
+    and every node is inserted straight into the shared *items* dict
+    (id → node).  Insertion order is post-order — a directory's
+    descendants come before the directory itself.
+
+    Returns the manifest node for *dir_path*, or None if the directory is
+    not eligible (no README).
+    """
+    vault_root = os.fspath(vault_root)
+    opened = _open_directory(os.fspath(dir_path), vault_root, root_title)
+    if opened is None:
+        return None
+
+    top_node, prefix, entries = opened
+    # Frames: (dir_node, slug_prefix, iterator over remaining entries)
+    stack = [(top_node, prefix, iter(entries))]
 
-    # Iterate over sorted directory entries
-    entries = sorted(dir_path.iterdir(), key=lambda e: (not e.is_dir(), e.name.lower()))
+    while stack:
+        dir_node, prefix, remaining = stack[-1]
+        children_ids = dir_node["children"]
 
-    for entry in entries:
-        if should_ignore(entry):
-            continue
+        for not_dir, name_lower, name, entry in remaining:
+            if should_ignore(name, not not_dir):
+                continue
 
-        # --- Graphics directory ---
-        if entry.is_dir() and is_graphics_dir(entry):
-            assets = collect_assets(entry)
-            if not assets:
+            # --- Graphics directory ---
+            if is_graphics_dir(name_lower, not not_dir):
+                assets = collect_assets(entry.path)
+                if not assets:
+                    continue
+                g_slug = f"{prefix}graphics"
+                g_id = make_id(g_slug, "graphics")
+                graphics_node = {
+                    "id": g_id,
+                    "type": "graphics",
+                    "slug": g_slug,
+                    "content_path": f"/{g_slug}/",
+                    "assets": assets,
+                    SOURCE_KEY: entry.path,
+                }
+                items[g_id] = graphics_node
+                children_ids.append(g_id)
                 continue
-            g_slug = f"{dir_slug}/graphics" if not is_root else "graphics"
-            g_id = make_id(g_slug, "graphics")
-            graphics_node = {
-                "id": g_id,
-                "type": "graphics",
-                "slug": g_slug,
-                "content_path": f"/{g_slug}/",
-                "assets": assets,
-            }
-            all_nodes[g_id] = graphics_node
-            children_ids.append(g_id)
-            continue
-
-        # --- Subdirectory (non-graphics) ---
-        if entry.is_dir():
-            result = walk_directory(entry, vault_root, root_title=None)
-            if result is not None:
-                sub_node = result["node"]
-                children_ids.append(sub_node["id"])
-                all_nodes.update(result["all_nodes"])
-            continue
-
-        # --- File ---
-        if entry.is_file() and entry.suffix.lower() == ".md":
-            # Skip the README itself (it's represented by the directory node)
-            if entry.name.lower() == "readme.md":
+
+            # --- Subdirectory (non-graphics): descend, resume here after ---
+            if not not_dir:
+                opened = _open_directory(entry.path, vault_root)
+                if opened is not None:
+                    sub_node, sub_prefix, sub_entries = opened
+                    stack.append((sub_node, sub_prefix, iter(sub_entries)))
+                    break
                 continue
 
-            file_stem = entry.stem
-            file_slug = f"{dir_slug}/{slugify(file_stem)}" if not is_root else slugify(file_stem)
-            file_id = make_id(file_slug, "file")
-
-            # Ensure unique ID if collision
-            if file_id in all_nodes:
-                file_id = slugify(file_slug) + "-file"
-
-            file_node = {
-                "id": file_id,
-                "type": "file",
-                "title": make_title(file_stem),
-                "slug": file_slug,
-                "content_path": f"/{file_slug}.html",
-            }
-            all_nodes[file_id] = file_node
-            children_ids.append(file_id)
-
-    dir_node["children"] = children_ids
-    all_nodes[dir_id] = dir_node
-
-    return {
-        "node": dir_node,
-        "all_nodes": all_nodes,
-    }
+            # --- File ---
+            # (len > 3: a bare ".md" is a hidden file with no stem)
+            if name_lower.endswith(".md") and len(name) > 3 and entry.is_file():
+                # Skip the README itself (it's represented by the directory node)
+                if name_lower == "readme.md":
+                    continue
+
+                file_stem = name[:-3]
+                file_slug = f"{prefix}{slugify(file_stem)}"
+                file_id = make_id(file_slug, "file")
+
+                # Ensure unique ID if collision
+                if file_id in items:
+                    file_id = slugify(file_slug) + "-file"
+
+                file_node = {
+                    "id": file_id,
+                    "type": "file",
+                    "title": make_title(file_stem),
+                    "slug": file_slug,
+                    "content_path": f"/{file_slug}.html",
+                    SOURCE_KEY: entry.path,
+                }
+                items[file_id] = file_node
+                children_ids.append(file_id)
+        else:
+            # All entries consumed — the directory is complete
+            stack.pop()
+            items[dir_node["id"]] = dir_node
+            if stack:
+                stack[-1][0]["children"].append(dir_node["id"])
+
+    return top_node
 
 
 # ---------------------------------------------------------------------------
@@ -242,20 +316,79 @@ def generate_manifest(vault_path: str, title: str = "Digi Garden") -> dict:
         print(f"Error: '{vault_path}' is not a valid directory.", file=sys.stderr)
         sys.exit(1)
 
-    result = walk_directory(vault_root, vault_root, root_title=title)
+    items: dict = {}
+    root_node = walk_directory(vault_root, vault_root, items, root_title=title)
 
-    if result is None:
+    if root_node is None:
         print(f"Error: No README.md found in root '{vault_path}'.", file=sys.stderr)
         sys.exit(1)
 
     manifest = {
-        "rootId": result["node"]["id"],
-        "items": result["all_nodes"],
+        "rootId": root_node["id"],
+        "items": items,
     }
 
     return manifest
 
 
+def pop_sources(manifest: dict) -> dict[str, str]:
+    """Strip the build-time source paths from every node of *manifest*.
+
+    Returns them as ``{node id: source path}``, so later build steps
+    (front matter, rendering, asset copies) find each node's files
+    without walking the vault again.
+    """
+    sources: dict[str, str] = {}
+    for node_id, node in manifest["items"].items():
+        src = node.pop(SOURCE_KEY, None)
+        if src is not None:
+            sources[node_id] = src
+    return sources
+
+
+# ---------------------------------------------------------------------------
+# Serialisation
+# ---------------------------------------------------------------------------
+
+def _has_nonfinite(value) -> bool:
+    """True if *value* holds a NaN or infinite float at any depth."""
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(_has_nonfinite(v) for v in value.values())
+    if isinstance(value, list):
+        return any(_has_nonfinite(v) for v in value)
+    return False
+
+
+def write_manifest(manifest: dict, dest: Path) -> None:
+    """Write the manifest to *dest* as indented JSON.
+
+    Uses orjson when it is installed (much faster on large vaults),
+    otherwise the stdlib encoder streaming straight into the file, so the
+    whole document never exists as one string.  Manifests orjson would
+    encode differently — integers beyond 64 bits (an error) or NaN/Inf
+    (written as null) in front matter — always go through the stdlib.
+    """
+    if orjson is not None and not any(
+        _has_nonfinite(node.get("metadata")) for node in manifest["items"].values()
+    ):
+        # Newline appended by the encoder — no extra concatenated copy
+        options = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+        try:
+            data = orjson.dumps(manifest, option=options)
+        except orjson.JSONEncodeError:
+            pass  # e.g. "Integer exceeds 64-bit range"
+        else:
+            dest.write_bytes(data)
+            return
+
+    # ensure_ascii=False: UTF-8 text, as orjson writes it
+    with dest.open("w", encoding="utf-8") as fp:
+        json.dump(manifest, fp, indent=2, ensure_ascii=False)
+        fp.write("\n")
+
+
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
@@ -281,9 +414,10 @@ def main():
 
     args = parser.parse_args()
     manifest = generate_manifest(args.vault_path, title=args.title)
+    pop_sources(manifest)
 
     output_path = Path(args.output)
-    output_path.write_text(json.dumps(manifest, indent=2) + "\n")
+    write_manifest(manifest, output_path)
     print(f"Manifest written to {output_path} ({len(manifest['items'])} nodes)")
 
 
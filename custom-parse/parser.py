@@ -9,5 +9,6 @@ The logic has been split into:
 """
 
 from pipeline import parse_vault
+from renderer import create_parser
 
-__all__ = ["parse_vault"]
+__all__ = ["parse_vault", "create_parser"]
@@ -5,182 +5,259 @@ Orchestrates the build process:
 - Copies graphics
 - Parses file pages
 - Parses directory READMEs
-- Manages file system lookups
 """
 
+import hashlib
+import os
 import shutil
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 import mistune
-from frontmatter import extract_frontmatter
+from frontmatter import strip_frontmatter
 import renderer
-from manifest import slugify
 
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
 
-def _find_source_md(vault_path: Path, slug: str) -> Path | None:
-    """Find the source .md file for a slug, handling name mismatches.
+def _is_fresh(src_file: str, out_file: Path) -> bool:
+    """True if *out_file* exists and is at least as new as *src_file*."""
+    try:
+        return os.stat(out_file).st_mtime >= os.stat(src_file).st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def _read_file(path: str) -> bytes:
+    """Read a whole file with raw fd calls (no buffered file object)."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        data = os.read(fd, size)
+        if len(data) < size:  # short read: finish in chunks
+            chunks = [data]
+            while chunk := os.read(fd, 1 << 16):
+                chunks.append(chunk)
+            data = b"".join(chunks)
+        return data
+    finally:
+        os.close(fd)
+
+
+def _write_file(path: str, data: bytes) -> None:
+    """Create or truncate *path* and write *data* with raw fd calls."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _make_output_dirs(nodes, output_path: Path) -> None:
+    """Create every output directory the given manifest nodes write into.
+
+    Each directory is created once, parents before children, so a plain
+    mkdir() suffices; no per-page mkdir(parents=True) probing up the tree.
+    """
+    root = os.fspath(output_path)
+    needed: set[str] = set()
+    for node in nodes:
+        content_path = node["content_path"]  # "/moss/look.html", "/moss/graphics/"
+        rel_dir = content_path[1:content_path.rfind("/")]
+        while rel_dir and rel_dir not in needed:
+            needed.add(rel_dir)
+            rel_dir = rel_dir.rpartition("/")[0]
+
+    os.makedirs(root, exist_ok=True)
+    # Parents sort before their children
+    for rel_dir in sorted(needed):
+        try:
+            os.mkdir(os.path.join(root, rel_dir))
+        except FileExistsError:
+            pass
+
+
+def _copy_file(paths: tuple[str, Path]) -> None:
+    """Copy one ``(src_file, dst_file)`` asset's contents.
+
+    Tries os.copy_file_range() first: the copy stays in the kernel, and
+    on reflink-capable filesystems (btrfs, XFS) it is a metadata-only
+    clone.  Falls back to shutil.copyfile() where unsupported.
+    """
+    src_file, dst_file = paths
+    if _HAS_COPY_FILE_RANGE:
+        try:
+            with open(src_file, "rb") as fsrc, open(dst_file, "wb") as fdst:
+                infd, outfd = fsrc.fileno(), fdst.fileno()
+                copied = 0
+                while sent := os.copy_file_range(infd, outfd, _COPY_CHUNK):
+                    copied += sent
+                # Some filesystems (procfs, FUSE, network mounts) report
+                # EOF straight away on a non-empty source
+                done = copied > 0 or os.fstat(infd).st_size == 0
+            if done:
+                return
+        except OSError:
+            pass  # e.g. EXDEV/ENOSYS on older kernels; retry portably
+    shutil.copyfile(src_file, dst_file)
+
+
+# ---------------------------------------------------------------------------
+# Render workers
+# ---------------------------------------------------------------------------
+
+# Per-process parser, built once by _init_worker()
+_worker_md: mistune.Markdown | None = None
+
+# Source files handed to each worker per round trip
+_RENDER_CHUNKSIZE = 32
+
+# Per-process cache of rendered HTML keyed by (page dir, content digest), so
+# verbatim-duplicate notes (stubs, templates) are rendered once.  The page
+# dir is part of the key because image embeds resolve relative to it.
+_html_cache: dict[tuple[str, bytes], str] = {}
+_HTML_CACHE_MAX = 1024
+
+# Graphics copies are I/O-bound (the GIL is released during the copy)
+_COPY_WORKERS = 16
 
-    The slug is kebab-cased but the original filename might have spaces,
-    underscores, or mixed case.
+# Bytes requested per os.copy_file_range() call (Linux only)
+_COPY_CHUNK = 1 << 30
+_HAS_COPY_FILE_RANGE = hasattr(os, "copy_file_range")
+
+
+def _init_worker(manifest: dict, rebuild: bool = False) -> None:
+    """ProcessPoolExecutor initializer: build this worker's parser.
+
+    parse_vault() also calls this in the parent, with *rebuild*, before
+    starting the pool, so every build gets a parser for its own manifest.
+    Workers started by fork inherit that parser (and its compiled
+    regexes, copy-on-write) and skip the rebuild; under spawn each
+    worker builds its own.
     """
-    parts = slug.split("/")
-    filename_slug = parts[-1]
-    parent_parts = parts[:-1]
-
-    parent_dir = vault_path
-    for p in parent_parts:
-        found = None
-        if parent_dir.is_dir():
-            for entry in parent_dir.iterdir():
-                if entry.is_dir():
-                    if slugify(entry.name) == p:
-                        found = entry
-                        break
-        if found:
-            parent_dir = found
-        else:
-            return None
-
-    if not parent_dir.is_dir():
-        return None
-
-    for entry in parent_dir.iterdir():
-        if entry.is_file() and entry.suffix.lower() == ".md":
-            if entry.name.lower() == "readme.md":
-                continue
-            if slugify(entry.stem) == filename_slug:
-                return entry
+    global _worker_md
+    if rebuild or _worker_md is None:
+        _worker_md = renderer.create_parser(manifest)
+        _html_cache.clear()  # rendered against the previous manifest
+
 
-    return None
+def _render_one(src_file: str, out_file: str, page_dir: str) -> None:
+    """Read one .md source, render it and write the HTML fragment."""
+    # Raw bytes + decode skips the text layer's newline translation;
+    # mistune normalises line endings itself
+    content = _read_file(src_file).decode("utf-8")
+    content = strip_frontmatter(content)
 
+    key = (page_dir, hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest())
+    html = _html_cache.get(key)
+    if html is None:
+        html = _worker_md(content, page_dir)
+        if len(_html_cache) < _HTML_CACHE_MAX:
+            _html_cache[key] = html
 
-def _resolve_slug_to_dir(vault_path: Path, slug: str) -> Path | None:
-    """Resolve a slugified path back to the real filesystem directory.
+    _write_file(out_file, html.encode("utf-8"))
 
-    Walks each segment of the slug, matching against actual directory names
-    via slugify() to handle spaces, mixed case, etc.
-    e.g. slug='moss/moss-1/graphics' → vault_path/'moss'/'moss 1'/'graphics'
+
+def _render_pages(pool: Executor, jobs: list[tuple[str, Path, str]]) -> None:
+    """Render ``(src_file, out_file, content_path)`` jobs on *pool*.
+
+    Rendering is CPU-bound pure Python, so the whole read → render →
+    write round trip runs in the worker processes and the disk traffic
+    is spread across them too.  Only paths cross the process boundary.
+    Output directories must already exist (parse_vault creates them).
     """
-    current = vault_path
-    for part in slug.split("/"):
-        # Try the literal name first (fast path)
-        candidate = current / part
-        if candidate.is_dir():
-            current = candidate
-            continue
-        # Fallback: scan siblings and match by slug
-        found = None
-        if current.is_dir():
-            for entry in current.iterdir():
-                if entry.is_dir() and slugify(entry.name) == part:
-                    found = entry
-                    break
-        if found:
-            current = found
-        else:
-            return None
-    return current
-
-
-def _find_readme(directory: Path) -> Path | None:
-    """Find README.md (case-insensitive) in a directory."""
-    for entry in directory.iterdir():
-        if entry.is_file() and entry.name.lower() == "readme.md":
-            return entry
-    return None
+    sources = [os.fspath(src_file) for src_file, _, _ in jobs]
+    outputs = [os.fspath(out_file) for _, out_file, _ in jobs]
+    # "/moss/look.html" → "/moss/"
+    page_dirs = [content_path[:content_path.rfind("/") + 1] for _, _, content_path in jobs]
+    # Drain the results so a worker exception is raised here
+    for _ in pool.map(_render_one, sources, outputs, page_dirs, chunksize=_RENDER_CHUNKSIZE):
+        pass
 
 
 # ---------------------------------------------------------------------------
 # Output generation
 # ---------------------------------------------------------------------------
 
-def copy_graphics(manifest: dict, vault_path: Path, output_path: Path) -> None:
-    """Copy graphics assets from vault to output directory."""
-    for node in manifest["items"].values():
-        if node["type"] != "graphics":
-            continue
+def copy_graphics(
+    nodes: list[dict], output_path: Path, sources: dict[str, str], incremental: bool = False,
+) -> None:
+    """Copy the assets of the given graphics nodes from vault to output directory."""
+    tasks: list[tuple[str, Path]] = []
 
+    for node in nodes:
         slug = node["slug"]
-        src_dir = _resolve_slug_to_dir(vault_path, slug)
+        src_dir = sources.get(node["id"])
         dst_dir = output_path / slug
 
-        if src_dir is None or not src_dir.is_dir():
-            print(f"  [warn] Graphics dir not found: {vault_path / slug}")
+        if src_dir is None:
+            print(f"  [warn] Graphics dir not found for: {slug}")
             continue
 
-        dst_dir.mkdir(parents=True, exist_ok=True)
+        # One listing answers "does this asset exist?" for the whole dir
+        with os.scandir(src_dir) as it:
+            existing = {e.name for e in it if e.is_file()}
 
         for asset in node.get("assets", []):
-            src_file = src_dir / asset
+            if asset not in existing:
+                continue
+            src_file = os.path.join(src_dir, asset)
             dst_file = dst_dir / asset
-            if src_file.is_file():
-                shutil.copy2(src_file, dst_file)
+            if incremental and _is_fresh(src_file, dst_file):
+                continue
+            tasks.append((src_file, dst_file))
+
+    with ThreadPoolExecutor(max_workers=_COPY_WORKERS) as pool:
+        list(pool.map(_copy_file, tasks))
 
     print("  [graphics] Assets copied.")
 
 
-def parse_file_pages(manifest: dict, vault_path: Path, output_path: Path, md: mistune.Markdown) -> None:
+def parse_file_pages(
+    nodes: list[dict], output_path: Path, pool: Executor,
+    sources: dict[str, str], incremental: bool = False,
+) -> None:
     """Parse each file-type node's .md → .html fragment."""
-    items = manifest["items"]
+    jobs: list[tuple[str, Path, str]] = []
 
-    for node in items.values():
-        if node["type"] != "file":
+    for node in nodes:
+        src_file = sources.get(node["id"])
+        if src_file is None:
+            print(f"  [warn] Source not found for: {node['slug']}")
             continue
 
-        slug = node["slug"]
-        src_file = vault_path / (slug + ".md")
-
-        if not src_file.is_file():
-            src_file = _find_source_md(vault_path, slug)
-            if src_file is None:
-                print(f"  [warn] Source not found for: {slug}")
-                continue
-
-        content = src_file.read_text(encoding="utf-8")
-        _, content = extract_frontmatter(content)
-        html = md(content)
-
         out_file = output_path / node["content_path"].lstrip("/")
-        out_file.parent.mkdir(parents=True, exist_ok=True)
-        out_file.write_text(html, encoding="utf-8")
+        if incremental and _is_fresh(src_file, out_file):
+            continue
+
+        jobs.append((src_file, out_file, node["content_path"]))
 
+    _render_pages(pool, jobs)
     print("  [files] Content pages parsed.")
 
 
-def parse_readme_pages(manifest: dict, vault_path: Path, output_path: Path, md: mistune.Markdown) -> None:
+def parse_readme_pages(
+    nodes: list[dict], output_path: Path, pool: Executor,
+    sources: dict[str, str], incremental: bool = False,
+) -> None:
     """Parse each directory-type node's README.md → HTML fragment with auto-nav."""
-    items = manifest["items"]
+    jobs: list[tuple[str, Path, str]] = []
 
-    for node in items.values():
-        if node["type"] != "directory":
-            continue
-
-        slug = node["slug"]
-        is_root = slug == "root"
-
-        if is_root:
-            src_dir = vault_path
-        else:
-            src_dir = _resolve_slug_to_dir(vault_path, slug)
-            if src_dir is None:
-                print(f"  [warn] Directory not found for slug: {slug}")
-                continue
-
-        readme_file = _find_readme(src_dir)
+    for node in nodes:
+        readme_file = sources.get(node["id"])
         if readme_file is None:
-            print(f"  [warn] README not found in: {src_dir}")
+            print(f"  [warn] README not found for: {node['slug']}")
             continue
 
-        content = readme_file.read_text(encoding="utf-8")
-        _, content = extract_frontmatter(content)
-        html = md(content)
-
         out_file = output_path / node["content_path"].lstrip("/")
-        out_file.parent.mkdir(parents=True, exist_ok=True)
-        out_file.write_text(html, encoding="utf-8")
+        if incremental and _is_fresh(readme_file, out_file):
+            continue
+
+        jobs.append((readme_file, out_file, node["content_path"]))
 
+    _render_pages(pool, jobs)
     print("  [readme] Home pages parsed.")
 
 
@@ -188,21 +265,35 @@ def parse_readme_pages(manifest: dict, vault_path: Path, output_path: Path, md:
 # Public entry point
 # ---------------------------------------------------------------------------
 
-def parse_vault(manifest: dict, vault_path: Path, output_path: Path) -> None:
+def parse_vault(
+    manifest: dict, sources: dict[str, str], output_path: Path, incremental: bool = False,
+) -> None:
     """Convert markdown files to HTML based on the manifest.
 
     Args:
         manifest:    The manifest dict (as produced by manifest.generate_manifest).
-        vault_path:  Resolved path to the source Obsidian vault.
+        sources:     ``{node id: source path}`` (as returned by manifest.pop_sources).
         output_path: Resolved path to the output directory.
+        incremental: Skip outputs already newer than their sources. Only
+                     valid when output_path holds a build of this same manifest.
     """
-    md = renderer.create_parser(manifest)
+    # Partition the nodes once; each job only walks its own type
+    by_type: dict[str, list[dict]] = {"file": [], "directory": [], "graphics": []}
+    for node in manifest["items"].values():
+        by_type[node["type"]].append(node)
+
+    # Every output directory up front, so the jobs below only write files
+    _make_output_dirs(manifest["items"].values(), output_path)
 
     # Job 1: Copy graphics
-    copy_graphics(manifest, vault_path, output_path)
+    copy_graphics(by_type["graphics"], output_path, sources, incremental)
 
-    # Job 2: Parse file content pages
-    parse_file_pages(manifest, vault_path, output_path, md)
+    # Markdown rendering is CPU-bound: one parser per worker process,
+    # built here first so forked workers inherit it
+    _init_worker(manifest, rebuild=True)
+    with ProcessPoolExecutor(initializer=_init_worker, initargs=(manifest,)) as pool:
+        # Job 2: Parse file content pages
+        parse_file_pages(by_type["file"], output_path, pool, sources, incremental)
 
-    # Job 3: Parse README home pages with auto-nav
-    parse_readme_pages(manifest, vault_path, output_path, md)
+        # Job 3: Parse README home pages with auto-nav
+        parse_readme_pages(by_type["directory"], output_path, pool, sources, incremental)
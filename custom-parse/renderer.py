@@ -8,66 +8,114 @@ Configures Mistune with custom plugins and renderers for:
 """
 
 import re
-import types
 import mistune
 from mistune import escape as escape_text
+from mistune.plugins import import_plugin
 
 import resolver
 
+# Sanitizer pattern: raw HTML that must not survive rendering, applied by
+# _sanitize().  Alternatives:
+#   - <style>, <script>, <iframe> tags and their content (closing tag must match)
+#   - on* event handler attributes, single- or double-quoted
+_SANITIZE_RE = re.compile(
+    r'<(?P<tag>style|script|iframe)[^>]*>.*?</(?P=tag)>'
+    r'''|\s+on\w+\s*=\s*(?:"[^"]*"|'[^']*')''',
+    re.DOTALL | re.IGNORECASE,
+)
+
+
+def _sanitize(html: str) -> str:
+    """Strip _SANITIZE_RE matches from rendered *html* until none are left.
+
+    One pass is not enough: removing a match can splice the text around
+    it into new markup, e.g. "<scr<style></style>ipt>" → "<script>".
+    Every substitution shortens the text, so the loop terminates.
+    """
+    n = 1
+    while n:
+        html, n = _SANITIZE_RE.subn('', html)
+    return html
+
+
+# slugify_heading(): inline HTML tags, and a translate table (applied after
+# lowercasing) that keeps [a-z0-9-] and turns everything else into "-"
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+class _HeadingSlugTable(dict):
+    """``str.translate`` table: prefilled characters map to themselves, any
+    other code point becomes ``-``."""
+
+    def __missing__(self, codepoint: int) -> str:
+        return '-'
+
+
+_HEADING_SLUG_TABLE = _HeadingSlugTable({ord(c): c for c in 'abcdefghijklmnopqrstuvwxyz0123456789-'})
+
+# Heading tag names by level, so the renderer never formats the int
+_HEADING_TAGS = {level: f'h{level}' for level in range(1, 7)}
+
+# Inline patterns registered with mistune.  These stay strings: mistune
+# splices every inline pattern into one combined regex per parser.
+WIKI_PATTERN = r"(?P<wiki_bang>!?)\[\[(?P<wiki_target>[^\]\n]+)\]\]"
+# A negated class rather than .+? so the engine scans without backtracking
+INLINE_DISPLAY_PATTERN = r'\$\$(?P<display_math_text>[^$\n]+)\$\$'
+
+
+class _SanitizedMarkdown(mistune.Markdown):
+    """Markdown whose rendered HTML is stripped of dangerous raw HTML."""
+
+    def __call__(self, text, page_dir='/'):
+        """Render *text*; *page_dir* is the page's content directory
+        (e.g. "/moss/"), used to pick the nearest graphics dir for embeds."""
+        # Heading ids are deduplicated per page, not across the build
+        self.renderer._heading_slugs = {}
+        self.renderer._page_dir = page_dir
+        return _sanitize(super().__call__(text))
+
+
 # ---------------------------------------------------------------------------
 # Mistune plugins for Obsidian syntax
 # ---------------------------------------------------------------------------
 
-def plugin_wiki_embed(md: mistune.Markdown) -> None:
-    """Plugin for ![[image.png]] Obsidian image embeds.
+def plugin_wiki(md: mistune.Markdown) -> None:
+    """Plugin for Obsidian ![[image.png]] embeds and [[page|display]] links.
 
-    Must be registered BEFORE wiki_link plugin since ![[...]] should
-    match before [[...]].
+    Both forms share one inline pattern; the optional leading "!" decides
+    whether a match becomes a wiki_embed or a wiki_link token, so the
+    combined inline regex carries one alternative for them, not two.
 
-    Uses a named capture group because mistune v3 combines all inline
-    patterns into one regex, making positional groups unreliable.
+    Uses named capture groups because mistune v3 combines all inline
+    patterns into one regex, making positional groups unreliable.  The
+    target cannot span lines, which bounds the scan after a stray "[[".
     """
-    WIKI_EMBED_PATTERN = r"!\[\[(?P<wiki_embed_target>[^\]]+)\]\]"
 
-    def parse_wiki_embed(inline, m, state):
-        filename = m.group("wiki_embed_target")
-        state.append_token({"type": "wiki_embed", "raw": filename})
+    def parse_wiki(inline, m, state):
+        token_type = "wiki_embed" if m.group("wiki_bang") else "wiki_link"
+        state.append_token({"type": token_type, "raw": m.group("wiki_target")})
         return m.end()
 
-    md.inline.register("wiki_embed", WIKI_EMBED_PATTERN, parse_wiki_embed, before="link")
+    md.inline.register("wiki", WIKI_PATTERN, parse_wiki, before="link")
 
     def render_wiki_embed(text):
         filename = text
         # Strip Obsidian pipe suffix (e.g. "img.png|350" → "img.png")
         if "|" in filename:
             filename = filename.split("|", 1)[0]
-        src = resolver.resolve_image_embed(filename, md.renderer._asset_index)
+        src = md.renderer._resolve_embed(filename, md.renderer._page_dir)
         # Use basename (no directory prefix) for alt text
-        basename = filename.rsplit("/", 1)[-1] if "/" in filename else filename
-        alt = basename.rsplit(".", 1)[0] if "." in basename else basename
+        basename = filename.rpartition("/")[2]
+        stem, dot, _ = basename.rpartition(".")
+        alt = stem if dot else basename
         return f'<img src="{src}" alt="{alt}" />'
 
-    md.renderer.wiki_embed = render_wiki_embed
-
-
-def plugin_wiki_link(md: mistune.Markdown) -> None:
-    """Plugin for [[page]] and [[page|display]] Obsidian wiki-links."""
-    WIKI_LINK_PATTERN = r"\[\[(?P<wiki_link_target>[^\]]+)\]\]"
-
-    def parse_wiki_link(inline, m, state):
-        raw = m.group("wiki_link_target")
-        state.append_token({"type": "wiki_link", "raw": raw})
-        return m.end()
-
-    md.inline.register("wiki_link", WIKI_LINK_PATTERN, parse_wiki_link, before="link")
-
     def render_wiki_link(text):
         raw = text
-        href, display = resolver.resolve_wiki_link(
-            raw, md.renderer._title_index, md.renderer._slug_index
-        )
+        href, display = md.renderer._resolve_link(raw)
         return f'<a href="{href}">{display}</a>'
 
+    md.renderer.wiki_embed = render_wiki_embed
     md.renderer.wiki_link = render_wiki_link
 
 
@@ -85,51 +133,33 @@ def slugify_heading(text: str) -> str:
          "What is O(n log n)?" → "what-is-on-log-n"
     """
     # Strip any inline HTML tags
-    slug = re.sub(r'<[^>]+>', '', text)
-    slug = slug.lower()
-    # Replace non-alphanumeric (keep hyphens) with hyphens
-    slug = re.sub(r'[^a-z0-9-]+', '-', slug)
-    # Collapse multiple hyphens
-    slug = re.sub(r'-{2,}', '-', slug)
-    return slug.strip('-')
+    if '<' in text:
+        text = _TAG_RE.sub('', text)
+    # Replace non-alphanumeric (keep hyphens) with hyphens, then split/join
+    # collapses hyphen runs and trims leading/trailing hyphens in one step
+    parts = text.lower().translate(_HEADING_SLUG_TABLE).split('-')
+    return '-'.join(p for p in parts if p)
 
 
 def create_parser(manifest: dict) -> mistune.Markdown:
     """Create a configured mistune Markdown parser with Obsidian plugins.
 
-    The manifest indexes are attached to the renderer so plugins can
-    resolve links and images at render time.
+    Memoised link and embed resolvers built from the manifest indexes are
+    attached to the renderer (``_resolve_link``, ``_resolve_embed``) so
+    plugins can resolve links and images at render time.
     """
-    md = mistune.create_markdown(
-        escape=False,
-        hard_wrap=True,
-        plugins=['math', plugin_wiki_embed, plugin_wiki_link],
+    # Same setup as mistune.create_markdown(), but on the sanitizing subclass
+    md = _SanitizedMarkdown(
+        renderer=mistune.HTMLRenderer(escape=False),
+        inline=mistune.InlineParser(hard_wrap=True),
+        plugins=[import_plugin(p) for p in ('math', plugin_wiki)],
     )
 
-    # Sanitize: strip dangerous raw HTML tags after rendering
-    _original_call = md.__class__.__call__
-
-    def _sanitized_call(self, text):
-        html = _original_call(self, text)
-        # Remove <style>, <script>, <iframe> tags and their content
-        html = re.sub(r'<style[^>]*>.*?</style>', '', html, flags=re.DOTALL | re.IGNORECASE)
-        html = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.DOTALL | re.IGNORECASE)
-        html = re.sub(r'<iframe[^>]*>.*?</iframe>', '', html, flags=re.DOTALL | re.IGNORECASE)
-        # Remove on* event handler attributes
-        html = re.sub(r'\s+on\w+\s*=\s*"[^"]*"', '', html, flags=re.IGNORECASE)
-        html = re.sub(r"\s+on\w+\s*=\s*'[^']*'", '', html, flags=re.IGNORECASE)
-        return html
-
-    md.__call__ = types.MethodType(_sanitized_call, md)
-
-    # Attach manifest indexes to the renderer for link/image resolution
-    title_index = resolver.build_title_index(manifest)
-    slug_index = resolver.build_slug_index(manifest)
-    asset_index = resolver.build_asset_index(manifest)
-
-    md.renderer._title_index = title_index
-    md.renderer._slug_index = slug_index
-    md.renderer._asset_index = asset_index
+    # Memoised link/image resolvers over the manifest indexes: the same
+    # targets recur across many pages
+    title_index, slug_index, asset_index = resolver.build_indexes(manifest)
+    md.renderer._resolve_link = resolver.make_wiki_resolver(title_index, slug_index)
+    md.renderer._resolve_embed = resolver.make_embed_resolver(asset_index)
 
     # Override block_code renderer to add copy-to-clipboard button
     def block_code(code, info=None):
@@ -152,17 +182,21 @@ def create_parser(manifest: dict) -> mistune.Markdown:
     md.renderer.block_code = block_code
 
     # Override heading renderer to add slugified id attributes for anchor links
-    # Tracks seen slugs per-render to deduplicate (e.g. "foo", "foo-1", "foo-2")
-    heading_slug_counts: dict[str, int] = {}
+    # Tracks seen slugs per-render to deduplicate (e.g. "foo", "foo-1", "foo-2");
+    # _SanitizedMarkdown.__call__ resets renderer._heading_slugs (and sets
+    # _page_dir) for each page.  Seed both so md.parse()/md.read() work too.
+    md.renderer._heading_slugs = {}
+    md.renderer._page_dir = '/'
 
     def heading(text, level, **attrs):
         slug = slugify_heading(text)
-        if slug in heading_slug_counts:
-            heading_slug_counts[slug] += 1
-            slug = f'{slug}-{heading_slug_counts[slug]}'
-        else:
-            heading_slug_counts[slug] = 0
-        return f'<h{level} id="{slug}"><a class="heading-anchor" href="#{slug}" data-link>{text}</a></h{level}>\n'
+        counts = md.renderer._heading_slugs
+        n = counts.get(slug, -1) + 1
+        counts[slug] = n
+        if n:
+            slug = f'{slug}-{n}'
+        tag = _HEADING_TAGS[level]
+        return f'<{tag} id="{slug}"><a class="heading-anchor" href="#{slug}" data-link>{text}</a></{tag}>\n'
 
     md.renderer.heading = heading
 
@@ -186,8 +220,6 @@ def create_parser(manifest: dict) -> mistune.Markdown:
     md.renderer.register('block_math', render_block_math)
 
     # Handle single-line $$...$$ (mistune's block pattern requires newlines)
-    INLINE_DISPLAY_PATTERN = r'\$\$(?P<display_math_text>.+?)\$\$'
-
     def parse_inline_display_math(inline, m, state):
         text = m.group('display_math_text')
         state.append_token({'type': 'block_math', 'raw': text})
@@ -4,6 +4,10 @@ Resolution logic for the Obsidian parser.
 Handles building indexes from the manifest and resolving wiki-links and image embeds.
 """
 
+import functools
+from collections import defaultdict
+from typing import Callable
+
 from manifest import slugify
 
 def build_title_index(manifest: dict) -> dict[str, list[dict]]:
@@ -11,12 +15,11 @@ def build_title_index(manifest: dict) -> dict[str, list[dict]]:
 
     Used for resolving [[wiki-links]] by title.
     """
-    index: dict[str, list[dict]] = {}
+    index: defaultdict[str, list[dict]] = defaultdict(list)
     for node in manifest["items"].values():
-        if node["type"] == "graphics":
-            continue
-        key = node.get("title", "").lower()
-        index.setdefault(key, []).append(node)
+        if node["type"] != "graphics":
+            index[node.get("title", "").lower()].append(node)
+    index.default_factory = None
     return index
 
 
@@ -32,30 +35,79 @@ def build_slug_index(manifest: dict) -> dict[str, dict]:
     }
 
 
-def build_asset_index(manifest: dict) -> dict[str, str]:
-    """Build a lookup from asset filename → graphics content_path prefix.
+def build_asset_index(manifest: dict) -> dict[str, list[str]]:
+    """Build a lookup from asset filename → absolute asset hrefs.
 
-    Used for resolving ![[image.png]] embeds.
-    e.g. {"hap.png": "/moss/graphics/", "ani3.gif": "/graphics/"}
+    Used for resolving ![[image.png]] embeds.  A filename present in
+    several graphics dirs keeps every href, in manifest order, so
+    resolve_image_embed() can pick the one nearest the embedding page.
+    e.g. {"hap.png": ["/moss/graphics/hap.png"], "ani3.gif": ["/graphics/ani3.gif"]}
     """
-    index: dict[str, str] = {}
+    index: defaultdict[str, list[str]] = defaultdict(list)
     for node in manifest["items"].values():
         if node["type"] == "graphics":
-            for asset in node.get("assets", []):
-                # If duplicate filenames across graphics dirs, last wins.
-                # Could be smarter (nearest ancestor), but simple for now.
-                index[asset] = node["content_path"]  # e.g. "/graphics/"
+            prefix = node["content_path"]
+            for asset in node.get("assets") or ():
+                index[asset].append(prefix + asset)
+    index.default_factory = None
     return index
 
 
-def resolve_wiki_link(target: str, title_index: dict, slug_index: dict) -> tuple[str, str]:
+def build_indexes(manifest: dict) -> tuple[dict, dict, dict]:
+    """Build (title_index, slug_index, asset_index) in one pass over the manifest.
+
+    Same result as calling the build_*_index functions above, but the
+    manifest is walked once.  Callers needing several indexes
+    (create_parser) build them here and pass them on; every call returns
+    fresh dicts.
+    """
+    # defaultdict: no throwaway [] per node as with setdefault()
+    title_index: defaultdict[str, list[dict]] = defaultdict(list)
+    slug_index: dict[str, dict] = {}
+    asset_index: defaultdict[str, list[str]] = defaultdict(list)
+    for node in manifest["items"].values():
+        if node["type"] == "graphics":
+            # Join prefix + filename once here rather than on every embed
+            prefix = node["content_path"]
+            for asset in node.get("assets") or ():
+                asset_index[asset].append(prefix + asset)
+        else:
+            slug_index[node["slug"]] = node
+            title_index[node.get("title", "").lower()].append(node)
+
+    # Freeze: later misses raise KeyError instead of inserting empty lists
+    title_index.default_factory = None
+    asset_index.default_factory = None
+
+    return title_index, slug_index, asset_index
+
+
+def build_link_table(title_index: dict, slug_index: dict) -> dict[str, tuple[str, str]]:
+    """Build a flat lookup from link key → (href, title) for wiki-links.
+
+    Keys are every node slug plus every lowercase title that names exactly
+    one node; a slug wins over a title with the same text.  This folds
+    the slug and title indexes into one dict, so resolve_wiki_link()
+    usually needs a single probe.
+    """
+    table: dict[str, tuple[str, str]] = {
+        key: (matches[0]["content_path"], matches[0]["title"])
+        for key, matches in title_index.items()
+        if len(matches) == 1  # ambiguous titles can't resolve without a path
+    }
+    for slug, node in slug_index.items():
+        table[slug] = (node["content_path"], node["title"])
+    return table
+
+
+def resolve_wiki_link(target: str, link_table: dict) -> tuple[str, str]:
     """Resolve a wiki-link target to (href, display_text).
 
     Tries:
-      1. Exact slug match (for path-style links like "nature/tundra/arctic")
-      2. Title match (case-insensitive, e.g. "Arctic")
-      3. Slugified target as slug match
-      4. Fallback: broken link
+      1. The slugified target (covers slugs, path-style links like
+         "nature/tundra/arctic", and "Moss Look" → "moss-look")
+      2. The lowercase target as a title (e.g. "Arctic")
+      3. Fallback: broken link
     """
     # Handle pipe syntax: [[target|display]]
     if "|" in target:
@@ -65,38 +117,46 @@ def resolve_wiki_link(target: str, title_index: dict, slug_index: dict) -> tuple
         display = None
 
     target_clean = target_part.strip()
-    target_lower = target_clean.lower()
-
-    # 1. Exact slug match
-    # Convert forward-slash path to slug format (e.g. "moss/look" already works)
-    slug_key = target_clean.replace(" ", "-").lower()
-    if slug_key in slug_index:
-        node = slug_index[slug_key]
-        href = node["content_path"]
-        return href, display or node["title"]
-
-    # 2. Title match
-    if target_lower in title_index:
-        matches = title_index[target_lower]
-        if len(matches) == 1:
-            node = matches[0]
-            href = node["content_path"]
-            return href, display or node["title"]
-        # Multiple matches — can't resolve without full path
-        # Fall through to broken link
-
-    # 3. Try slugified version
-    slugified = slugify(target_clean)
-    if slugified in slug_index:
-        node = slug_index[slugified]
-        href = node["content_path"]
-        return href, display or node["title"]
-
-    # 4. Fallback: broken link
+
+    entry = link_table.get(slugify(target_clean)) or link_table.get(target_clean.lower())
+    if entry is not None:
+        href, title = entry
+        return href, display or title
+
+    # Fallback: broken link
     return "#", display or target_clean
 
 
-def resolve_image_embed(filename: str, asset_index: dict) -> str:
+def make_wiki_resolver(title_index: dict, slug_index: dict) -> Callable[[str], tuple[str, str]]:
+    """Return a memoised ``resolve(target) → (href, display_text)`` over the given indexes.
+
+    Builds the link table once.  Pages link to the same targets over and
+    over; the closure lets the cache key on the target alone (the table
+    itself is unhashable).
+    """
+    link_table = build_link_table(title_index, slug_index)
+
+    @functools.lru_cache(maxsize=None)
+    def resolve(target: str) -> tuple[str, str]:
+        return resolve_wiki_link(target, link_table)
+
+    return resolve
+
+
+def make_embed_resolver(asset_index: dict) -> Callable[[str, str], str]:
+    """Return a memoised ``resolve(filename, page_dir) → src`` bound to *asset_index*.
+
+    Counterpart of make_wiki_resolver() for ![[image]] embeds.
+    """
+
+    @functools.lru_cache(maxsize=4096)
+    def resolve(filename: str, page_dir: str) -> str:
+        return resolve_image_embed(filename, asset_index, page_dir)
+
+    return resolve
+
+
+def resolve_image_embed(filename: str, asset_index: dict, page_dir: str = "/") -> str:
     """Resolve an image embed filename to an absolute content path.
 
     Returns paths with a leading slash so they are unambiguous
@@ -107,14 +167,30 @@ def resolve_image_embed(filename: str, asset_index: dict) -> str:
     (e.g. "graphics/ani3.gif") — we strip it and look up by
     basename only, since the asset_index is keyed on filenames.
 
+    When several graphics dirs hold the same filename, the one nearest
+    the embedding page wins: the deepest dir whose owner is *page_dir*
+    or one of its ancestors (e.g. "/moss/" for a page in moss/).
+
     e.g. "hap.png"           → "/moss/graphics/hap.png"
          "graphics/ani3.gif" → "/graphics/ani3.gif"
          "img.png"           → "/graphics/img.png"
     """
-    filename = filename.strip()
-    # Strip any directory prefix (Obsidian sometimes includes "graphics/")
-    basename = filename.rsplit("/", 1)[-1] if "/" in filename else filename
-    if basename in asset_index:
-        return asset_index[basename] + basename
-    # Fallback: assume root graphics
-    return f"/graphics/{basename}"
+    # Strip any directory prefix (Obsidian sometimes includes "graphics/");
+    # rpartition yields the whole string when there is no "/"
+    basename = filename.strip().rpartition("/")[2]
+    hrefs = asset_index.get(basename)
+    if not hrefs:
+        # Fallback: assume root graphics
+        return f"/graphics/{basename}"
+    if len(hrefs) == 1:
+        return hrefs[0]
+
+    # Nearest ancestor; with no ancestor among them, the last one listed
+    best = hrefs[-1]
+    best_len = -1
+    strip = len("graphics/") + len(basename)
+    for href in hrefs:
+        owner = href[:-strip]  # "/moss/graphics/hap.png" → "/moss/"
+        if len(owner) > best_len and page_dir.startswith(owner):
+            best, best_len = href, len(owner)
+    return best
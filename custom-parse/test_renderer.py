@@ -0,0 +1,69 @@
+"""Regression tests for the renderer (sanitizer, embeds).
+
+Run from custom-parse/:  python -m unittest
+"""
+
+import unittest
+
+import renderer
+
+# Minimal manifest: the root page and one graphics dir
+_MANIFEST = {
+    "rootId": "root-dir",
+    "items": {
+        "root-graphics": {
+            "id": "root-graphics",
+            "type": "graphics",
+            "slug": "graphics",
+            "content_path": "/graphics/",
+            "assets": ["hap.png"],
+        },
+        "root-dir": {
+            "id": "root-dir",
+            "type": "directory",
+            "title": "Root",
+            "slug": "root",
+            "content_path": "/readme.html",
+            "children": ["root-graphics"],
+        },
+    },
+}
+
+
+class SanitizeTest(unittest.TestCase):
+    def setUp(self):
+        self.md = renderer.create_parser(_MANIFEST)
+
+    def assertNoScript(self, html):
+        self.assertNotRegex(html.lower(), r"<script")
+
+    def test_removes_script_block(self):
+        self.assertNoScript(self.md("<div><script>alert(1)</script></div>\n"))
+
+    def test_spliced_script_inside_style(self):
+        # Removing the inner <style> block joins "<scr" + "ipt>"
+        self.assertNoScript(self.md("<div><scr<style></style>ipt>alert(1)</script></div>\n"))
+
+    def test_spliced_script_inside_script(self):
+        self.assertNoScript(self.md("<div><scr<script></script>ipt>alert(1)</script></div>\n"))
+
+    def test_removes_event_handler(self):
+        html = self.md('<div>\n<img src=x onerror="alert(1)">\n</div>\n')
+        self.assertNotIn("onerror", html)
+
+    def test_spliced_event_handler(self):
+        # Removing the <style> block joins " o" + "nerror=..."
+        html = self.md('<div>\n<img src=x o<style></style>nerror="alert(1)">\n</div>\n')
+        self.assertNotIn("onerror", html)
+
+
+class EmbedTest(unittest.TestCase):
+    def test_parse_without_call(self):
+        # md.parse() skips _SanitizedMarkdown.__call__, which sets _page_dir
+        md = renderer.create_parser(_MANIFEST)
+        html, _ = md.parse("![[hap.png]]\n")
+        self.assertIn('src="/graphics/hap.png"', html)
+
+
+if __name__ == "__main__":
+    unittest.main()